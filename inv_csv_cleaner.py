@@ -1,30 +1,215 @@
 #!/usr/bin/env python3
 import csv
+import glob
+import io
 import logging
 import os
 import sys
-from datetime import datetime
-
-import numpy as np
-import pandas as pd
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(
-            os.path.expanduser("~/Documents/Inventory_Processing/debug_log.txt")
-        ),
-        logging.StreamHandler(),
-    ],
-)
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+# Configure logging only if nothing else has, so importing this module
+# doesn't stack duplicate handlers on an already configured root logger.
+# Worker processes started with spawn (the macOS and Windows default) begin
+# with an empty root logger and so open their own handle on the log file.
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(
+                os.path.expanduser("~/Documents/Inventory_Processing/debug_log.txt")
+            ),
+            logging.StreamHandler(),
+        ],
+    )
 logger = logging.getLogger(__name__)
 
+# Process umask, used to give files created with mkstemp the usual permissions
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# Number of bytes to read and clean at a time
+BLOCK_SIZE = 64 << 20
+
+# Category rows to filter out
+CATEGORIES = frozenset(
+    {
+        "Uncategorized",
+        "Inventory",
+        "Total Inventory",
+        "Total Uncategorized",
+        "TOTAL",
+        "Core Stock - ATL",
+        "Total Core Stock - ATL",
+        "Total Core Stock - ATL\\",
+        "Core Stock - ATL\\",
+        "Core Stock - ATL, AMS",
+        "Total Core Stock - ATL, AMS",
+    }
+)
+
+# Prefixes of SKUs to filter out
+PREFIXES = (
+    "14-",
+    "16-",
+    "20-",
+    "21-",
+    "70-",
+    "00-",
+    "14.",
+    "320-",
+    "IP15L",
+    "IP19L",
+    "Chrome-",
+    "Customs-",
+    "LGE-",
+    "OF15L",
+    "R15L",
+    "RM12L",
+    "W24L",
+    "VGL",
+    "BSBI-",
+    "Seneca-",
+    "BF",
+    "OptConnect-",
+    "BrightSign-",
+)
+
+
+# Characters with a special meaning in RE2 (the engine Arrow uses)
+REGEX_METACHARACTERS = frozenset("\\.+*?()|[]{}^$")
+
+
+def build_prefix_pattern(prefixes):
+    """Build one anchored regex pattern, shaped like a trie, matching prefixes."""
+    trie = {}
+    for prefix in prefixes:
+        node = trie
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[""] = {}  # Marks the end of a prefix
+
+    def escape(char):
+        return "\\" + char if char in REGEX_METACHARACTERS else char
+
+    def to_pattern(node):
+        # A shorter prefix already matches, so longer branches are redundant
+        if "" in node:
+            return ""
+        branches = [
+            escape(char) + to_pattern(child) for char, child in sorted(node.items())
+        ]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return "^" + to_pattern(trie)
+
+
+# Arrow value set and match options built once at import time
+CATEGORY_ARRAY = pa.array(sorted(CATEGORIES), type=pa.string())
+PREFIX_PATTERN = build_prefix_pattern(PREFIXES)
+PREFIX_MATCH_OPTIONS = pc.MatchSubstringOptions(PREFIX_PATTERN)
+NEEDS_QUOTING_OPTIONS = pc.MatchSubstringOptions(r'[",\r\n]')
+
+
+def cleaned_filename(input_filename, output_folder):
+    """Return the path the cleaned copy of an input file is saved to."""
+    base_name = os.path.splitext(os.path.basename(input_filename))[0]
+    return os.path.join(output_folder, f"{base_name}_cleaned.csv")
+
+
+def read_header(input_filename):
+    """Return the column names from the first line of the CSV, or None if empty."""
+    with open(input_filename, encoding="cp1252", newline="") as f:
+        return next(csv.reader(f), None)
+
+
+def record_invalid_row(row, invalid_rows):
+    """Log and record a row whose column count doesn't match the header."""
+    logger.warning(
+        "Invalid row %s: expected %d columns, got %d: %s",
+        row.number,
+        row.expected_columns,
+        row.actual_columns,
+        row.text,
+    )
+    invalid_rows.append(row.number)
+    return "skip"
+
+
+def clean_batch(batch, schema):
+    """Filter out category and prefix rows and clean the SKU format."""
+    # The CSV parser already strips the quotes around each SKU
+    sku_column = batch.column(0)
+
+    # Build one boolean mask for categories and prefixes
+    mask_cat = pc.is_in(sku_column, value_set=CATEGORY_ARRAY)
+    mask_pref = pc.match_substring_regex(sku_column, options=PREFIX_MATCH_OPTIONS)
+    keep = pc.invert(pc.or_(mask_cat, mask_pref))
+
+    # Filter every column in one pass
+    batch = batch.filter(keep)
+
+    # Process SKU format safely
+    sku_column = pc.list_element(
+        pc.split_pattern(batch.column(0), pattern=" (", max_splits=1), 0
+    )
+
+    return pa.RecordBatch.from_arrays([sku_column] + batch.columns[1:], schema=schema)
+
+
+def write_rows(rows, output_file):
+    """Append rows to the binary output file with csv.QUOTE_MINIMAL quoting."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+    writer.writerows(rows)
+    output_file.write(buffer.getvalue().encode("utf-8"))
 
-def clean_and_save_file(input_filename, output_folder):
+
+def quote_minimal(column, quote_empty=False):
+    """Quote the values of a string column that csv.QUOTE_MINIMAL would quote."""
+    needs_quoting = pc.match_substring_regex(column, options=NEEDS_QUOTING_OPTIONS)
+    if quote_empty:
+        needs_quoting = pc.or_(needs_quoting, pc.equal(column, ""))
+
+    escaped = pc.replace_substring(column, pattern='"', replacement='""')
+    quoted = pc.binary_join_element_wise('"', escaped, '"', "")
+    return pc.if_else(needs_quoting, quoted, column)
+
+
+def write_batch(batch, output_file):
+    """Append a cleaned batch to the output file with minimal quoting."""
+    if batch.num_rows == 0:
+        return
+
+    # Like the csv module, quote empty values in a one-column file so the
+    # rows aren't written as blank lines that CSV readers skip
+    quote_empty = batch.num_columns == 1
+    columns = [quote_minimal(column, quote_empty) for column in batch.columns]
+
+    # Join each row's fields with commas, end it with a newline, and write
+    # the joined values straight from the Arrow buffer
+    rows = pc.binary_join_element_wise(*columns, ",")
+    rows = pc.binary_join_element_wise(rows, "", "\n")
+    _, offsets_buffer, data_buffer = rows.buffers()
+    offsets = pa.Array.from_buffers(
+        pa.int32(), len(rows) + 1, [None, offsets_buffer], offset=rows.offset
+    )
+    start, end = offsets[0].as_py(), offsets[-1].as_py()
+    output_file.write(memoryview(data_buffer)[start:end])
+
+
+def clean_and_save_file(input_filename, output_folder, block_size=BLOCK_SIZE):
     """Process and clean the inventory CSV file."""
-    logger.info(f"Starting to process file: {input_filename}")
+    logger.info("Starting to process file: %s", input_filename)
+    temp_filename = None
 
     try:
         # Skip if this is already a cleaned file
@@ -32,161 +217,177 @@ def clean_and_save_file(input_filename, output_folder):
             logger.info("Skipping already cleaned file")
             return
 
-        # Read the CSV with specific encoding and quote handling
-        df = pd.read_csv(
-            input_filename,
-            encoding="cp1252",
-            header=0,
-            quoting=csv.QUOTE_ALL,
-        )
-        logger.info(f"Successfully read CSV with {len(df)} rows")
-
-        # Make a copy of the first column to use as index
-        # This avoids any issues with in-place modifications
-        sku_column = df.iloc[:, 0].copy()
-
-        # Convert to string safely
-        sku_column = sku_column.astype(str)
-
-        # Remove quotes safely
-        sku_column = sku_column.str.replace('"', "", regex=False)
-
-        # Set as index
-        df = df.iloc[:, 1:]  # Remove the first column
-        df.index = sku_column
-        df.index.name = "SKU"
-
-        # Clean column names (remove quotes)
-        df.columns = [str(col).replace('"', "") for col in df.columns]
-
-        logger.info("Set SKU index successfully")
-
-        # List of categories to filter out
-        categories = [
-            "Uncategorized",
-            "Inventory",
-            "Total Inventory",
-            "Total Uncategorized",
-            "TOTAL",
-            "Core Stock - ATL",
-            "Total Core Stock - ATL",
-            "Total Core Stock - ATL\\",
-            "Core Stock - ATL\\",
-            "Core Stock - ATL, AMS",
-            "Total Core Stock - ATL, AMS",
-        ]
-
-        # Create simple filter lists for safety
-        to_keep = []
-        for idx in df.index:
-            idx_str = str(idx)
-
-            # Check if it's a category to filter out
-            if idx_str in categories:
-                continue
-
-            # Check if it matches number patterns
-            if idx_str.startswith(
-                (
-                    "14-",
-                    "16-",
-                    "20-",
-                    "21-",
-                    "70-",
-                    "00-",
-                    "14.",
-                    "320-",
-                    "IP15L",
-                    "IP19L",
-                    "Chrome-",
-                    "Customs-",
-                    "LGE-",
-                    "OF15L",
-                    "R15L",
-                    "RM12L",
-                    "W24L",
-                    "VGL",
-                )
-            ):
-                continue
-
-            # Check prefixes
-            if idx_str.startswith(
-                (
-                    "BSBI-",
-                    "Seneca-",
-                    "BF",
-                    "OptConnect-",
-                    "BrightSign-",
-                    "Chrome-",
-                    "Customs-",
-                    "IP15L",
-                    "IP19L",
-                )
-            ):
-                continue
-
-            # Otherwise keep it
-            to_keep.append(idx)
-
-        # Filter the dataframe
-        original_count = len(df)
-        df = df.loc[to_keep]
-        filtered_count = original_count - len(df)
-        logger.info(f"Filtered out {filtered_count} rows")
-
-        # Process SKU format safely
-        new_index = []
-        for idx in df.index:
-            idx_str = str(idx)
-            if " (" in idx_str:
-                new_index.append(idx_str.split(" (")[0])
-            else:
-                new_index.append(idx_str)
-
-        df.index = new_index
-        logger.info("Cleaned SKU formats")
-
         # Create output path
-        input_basename = os.path.basename(input_filename)
-        base_name = os.path.splitext(input_basename)[0]
-        new_filename = os.path.join(output_folder, f"{base_name}_cleaned.csv")
-        logger.info(f"Preparing to save to: {new_filename}")
+        new_filename = cleaned_filename(input_filename, output_folder)
+        logger.info("Preparing to save to: %s", new_filename)
 
         # Create output directory if needed
         os.makedirs(output_folder, exist_ok=True)
 
-        # Save the cleaned file
-        df.to_csv(
-            new_filename,
-            quoting=csv.QUOTE_MINIMAL,  # Changed to MINIMAL for safety
-            encoding="utf-8",
+        # Read every column as a string so values are written back untouched
+        # and each streamed block has the same schema
+        column_names = read_header(input_filename)
+        if column_names is None:
+            logger.error("Input file is empty: %s", input_filename)
+            return False
+
+        convert_options = pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in column_names}
         )
+
+        # Clean column names (remove quotes), keeping the blank SKU header
+        # the cleaned files have always had
+        output_names = [""] + [name.replace('"', "") for name in column_names[1:]]
+        schema = pa.schema([pa.field(name, pa.string()) for name in output_names])
+
+        # Write to a uniquely named temporary file in the output folder, so a
+        # run that fails partway through never leaves a partial cleaned file
+        # behind and parallel runs never share a temporary file
+        fd, temp_filename = tempfile.mkstemp(suffix=".tmp", dir=output_folder)
+
+        # Stream the CSV through pyarrow block by block so memory stays bounded.
+        # Rows with the wrong column count are collected so every one of them
+        # is logged, then the file fails instead of silently losing data
+        original_count = 0
+        kept_count = 0
+        invalid_rows = []
+        with os.fdopen(fd, "wb") as output_file:
+            write_rows([output_names], output_file)
+
+            reader = pacsv.open_csv(
+                input_filename,
+                read_options=pacsv.ReadOptions(
+                    encoding="cp1252", block_size=block_size
+                ),
+                parse_options=pacsv.ParseOptions(
+                    invalid_row_handler=lambda row: record_invalid_row(
+                        row, invalid_rows
+                    )
+                ),
+                convert_options=convert_options,
+            )
+            for batch in reader:
+                original_count += batch.num_rows
+                batch = clean_batch(batch, schema)
+                kept_count += batch.num_rows
+                write_batch(batch, output_file)
+
+        if invalid_rows:
+            raise ValueError(
+                f"{len(invalid_rows)} rows have the wrong number of columns"
+            )
+
+        # mkstemp makes the file private; give it the usual permissions
+        os.chmod(temp_filename, 0o666 & ~UMASK)
+        os.replace(temp_filename, new_filename)
+        temp_filename = None
+
+        logger.info("Successfully read CSV with %d rows", original_count)
+        logger.info("Filtered out %d rows", original_count - kept_count)
         logger.info("File saved successfully")
 
         return True
 
     except Exception as e:
-        logger.error(f"Error processing file: {str(e)}")
+        logger.error("Error processing file: %s", e)
         import traceback
 
-        logger.error(f"Full error trace: {traceback.format_exc()}")
+        logger.error("Full error trace: %s", traceback.format_exc())
+
+        # Remove the partial output of the failed run
+        if temp_filename is not None and os.path.exists(temp_filename):
+            os.remove(temp_filename)
         return False
 
 
+def clean_and_save_files(input_files, output_folder, max_workers=None):
+    """Clean many inventory CSV files in parallel worker processes."""
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    elif not isinstance(max_workers, int) or max_workers < 1:
+        raise ValueError(f"max_workers must be a positive integer, got {max_workers!r}")
+
+    if not input_files:
+        return True
+
+    # Refuse to start if two inputs would be saved to the same cleaned file
+    inputs_by_output = {}
+    for input_file in input_files:
+        if "cleaned" not in input_file:
+            output_file = cleaned_filename(input_file, output_folder)
+            inputs_by_output.setdefault(output_file, []).append(input_file)
+
+    collisions = {
+        output_file: files
+        for output_file, files in inputs_by_output.items()
+        if len(files) > 1
+    }
+    for output_file, files in collisions.items():
+        logger.error(
+            "Input files %s would all be saved to %s", ", ".join(files), output_file
+        )
+    if collisions:
+        return False
+
+    # Workers import the module once and then handle many files each
+    max_workers = min(max_workers, len(input_files))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(clean_and_save_file, input_files, repeat(output_folder))
+        )
+
+    # Skipped (already cleaned) files return None and don't count as failures
+    return False not in results
+
+
+def log_usage():
+    """Log the command line usage."""
+    logger.error("Usage: python3 item_csv_cleaner.py input_file output_folder")
+    logger.error(
+        "       python3 item_csv_cleaner.py --glob pattern output_folder "
+        "[max_workers]"
+    )
+
+
 def main():
     """Main function to handle script execution."""
     logger.info("Script starting...")
 
-    if len(sys.argv) < 3:
-        logger.error("Usage: python3 item_csv_cleaner.py input_file output_folder")
+    if len(sys.argv) >= 4 and sys.argv[1] == "--glob":
+        # Batch mode: clean every file matching the pattern
+        pattern = sys.argv[2]
+        output_folder = sys.argv[3]
+        max_workers = None
+        if len(sys.argv) > 4:
+            try:
+                max_workers = int(sys.argv[4])
+            except ValueError:
+                max_workers = 0
+            if max_workers < 1:
+                logger.error("max_workers must be a positive integer")
+                log_usage()
+                sys.exit(1)
+
+        input_files = sorted(glob.glob(pattern))
+        logger.info("Found %d input files matching: %s", len(input_files), pattern)
+        logger.info("Output folder: %s", output_folder)
+
+        if not input_files:
+            logger.error("No input files found")
+            sys.exit(1)
+
+        success = clean_and_save_files(input_files, output_folder, max_workers)
+        sys.exit(0 if success else 1)
+
+    if len(sys.argv) < 3 or sys.argv[1] == "--glob":
+        log_usage()
         sys.exit(1)
 
     input_file = sys.argv[1]
     output_folder = sys.argv[2]
 
-    logger.info(f"Input file: {input_file}")
-    logger.info(f"Output folder: {output_folder}")
+    logger.info("Input file: %s", input_file)
+    logger.info("Output folder: %s", output_folder)
 
     success = clean_and_save_file(input_file, output_folder)
     sys.exit(0 if success else 1)
@@ -0,0 +1,216 @@
+import logging
+import sys
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pytest
+
+# Give the root logger a handler first, so importing the script doesn't
+# configure its FileHandler under ~/Documents
+logging.getLogger().addHandler(logging.NullHandler())
+
+import inv_csv_cleaner  # noqa: E402
+
+# Category rows, prefixed SKUs, " (" suffixes and values that need quoting
+BASELINE_INPUT = '''\
+"SKU","Description","Qty","Price"
+"Inventory","Inventory","0","0"
+"ABC-100 (Blue)","Widget, large","5","12.5"
+"ABC-200","Plain widget","3","7.25"
+"14-555","Filtered by prefix","1","1.5"
+"14.9","Filtered by dotted prefix","2","2.5"
+"BF-1","Filtered by BF","1","1.5"
+"BSBI-7","Filtered by BSBI","1","1.5"
+"IP15L-3 (Old)","Filtered by IP15L","1","1.5"
+"Core Stock - ATL","Category","0","0"
+"XYZ (A) (B)","Say ""hi""","8","3.75"
+"LGE","Not a prefix match","4","4.5"
+"Total Inventory","Totals","19","30"
+"TOTAL","Totals","19","30"
+'''
+
+# What the baseline pandas implementation wrote for BASELINE_INPUT
+BASELINE_OUTPUT = '''\
+,Description,Qty,Price
+ABC-100,"Widget, large",5,12.5
+ABC-200,Plain widget,3,7.25
+XYZ,"Say ""hi""",8,3.75
+LGE,Not a prefix match,4,4.5
+'''
+
+
+def write_input(tmp_path, text, name="inventory.csv"):
+    path = tmp_path / name
+    path.write_bytes(text.encode("cp1252"))
+    return str(path)
+
+
+def read_output(tmp_path, name="inventory_cleaned.csv"):
+    return (tmp_path / "out" / name).read_text(encoding="utf-8")
+
+
+def test_output_matches_baseline(tmp_path):
+    input_file = write_input(tmp_path, BASELINE_INPUT)
+
+    assert inv_csv_cleaner.clean_and_save_file(input_file, str(tmp_path / "out"))
+    assert read_output(tmp_path) == BASELINE_OUTPUT
+
+
+def test_small_blocks_give_the_same_output(tmp_path):
+    input_file = write_input(tmp_path, BASELINE_INPUT)
+
+    assert inv_csv_cleaner.clean_and_save_file(
+        input_file, str(tmp_path / "out"), block_size=64
+    )
+    assert read_output(tmp_path) == BASELINE_OUTPUT
+
+
+def test_values_pass_through_as_written(tmp_path):
+    input_file = write_input(
+        tmp_path, '"SKU","Desc","Qty"\n"","caf\xe9","007"\n"A (x)","","1.50"\n'
+    )
+
+    assert inv_csv_cleaner.clean_and_save_file(input_file, str(tmp_path / "out"))
+    assert read_output(tmp_path) == ",Desc,Qty\n,caf\xe9,007\nA,,1.50\n"
+
+
+def test_rows_with_wrong_column_count_fail_without_output(tmp_path, caplog):
+    input_file = write_input(
+        tmp_path, '"SKU","Desc","Qty"\n"A","a","1"\n"Y","1"\n"B","b","2","x"\n'
+    )
+
+    assert not inv_csv_cleaner.clean_and_save_file(input_file, str(tmp_path / "out"))
+    assert "expected 3 columns, got 2" in caplog.text
+    assert "expected 3 columns, got 4" in caplog.text
+    assert "2 rows have the wrong number of columns" in caplog.text
+    assert not list((tmp_path / "out").iterdir())
+
+
+def test_empty_file_fails_without_output(tmp_path, caplog):
+    input_file = write_input(tmp_path, "")
+
+    assert not inv_csv_cleaner.clean_and_save_file(input_file, str(tmp_path / "out"))
+    assert "Input file is empty" in caplog.text
+    assert not list((tmp_path / "out").iterdir())
+
+
+def test_failed_run_leaves_no_output(tmp_path):
+    input_file = tmp_path / "inventory.csv"
+    # 0x81 is undefined in cp1252, so decoding fails after the first blocks
+    input_file.write_bytes(b'"SKU","Desc"\n' + b'"A","b"\n' * 1000 + b'"C","\x81"\n')
+
+    assert not inv_csv_cleaner.clean_and_save_file(
+        str(input_file), str(tmp_path / "out"), block_size=256
+    )
+    assert not list((tmp_path / "out").iterdir())
+
+
+def test_cleaned_files_are_skipped(tmp_path):
+    input_file = write_input(tmp_path, BASELINE_INPUT, name="inventory_cleaned.csv")
+
+    assert inv_csv_cleaner.clean_and_save_file(input_file, str(tmp_path)) is None
+
+
+def test_prefix_pattern_matches_startswith():
+    skus = [
+        prefix + suffix
+        for prefix in inv_csv_cleaner.PREFIXES + ("", "1", "14", "B", "IP1", "X")
+        for suffix in ("", "0", "-", " (x)")
+    ]
+    matches = pc.match_substring_regex(
+        pa.array(skus), options=inv_csv_cleaner.PREFIX_MATCH_OPTIONS
+    )
+
+    assert matches.to_pylist() == [
+        sku.startswith(inv_csv_cleaner.PREFIXES) for sku in skus
+    ]
+
+
+def test_quoting_matches_csv_module(tmp_path):
+    input_file = write_input(
+        tmp_path, '"SKU","Desc"\n"A","two\nlines"\n"B","tab\there"\n"C","a,""b"""\n'
+    )
+
+    assert inv_csv_cleaner.clean_and_save_file(input_file, str(tmp_path / "out"))
+    assert read_output(tmp_path) == ',Desc\nA,"two\nlines"\nB,tab\there\nC,"a,""b"""\n'
+
+
+def test_empty_sku_in_one_column_file_is_quoted(tmp_path):
+    input_file = write_input(tmp_path, '"SKU"\n"A"\n""\n"B"\n')
+
+    assert inv_csv_cleaner.clean_and_save_file(input_file, str(tmp_path / "out"))
+    assert read_output(tmp_path) == '""\nA\n""\nB\n'
+
+
+def test_batch_treats_skipped_files_as_success(tmp_path):
+    files = [
+        write_input(tmp_path, BASELINE_INPUT, name="a.csv"),
+        write_input(tmp_path, BASELINE_INPUT, name="b_cleaned.csv"),
+    ]
+
+    assert inv_csv_cleaner.clean_and_save_files(files, str(tmp_path / "out"), 2)
+    assert read_output(tmp_path, "a_cleaned.csv") == BASELINE_OUTPUT
+
+
+def test_batch_fails_when_any_file_fails(tmp_path):
+    files = [
+        write_input(tmp_path, BASELINE_INPUT, name="a.csv"),
+        write_input(tmp_path, "", name="b.csv"),
+    ]
+
+    assert not inv_csv_cleaner.clean_and_save_files(files, str(tmp_path / "out"), 2)
+    assert read_output(tmp_path, "a_cleaned.csv") == BASELINE_OUTPUT
+
+
+def test_batch_with_no_files_succeeds(tmp_path):
+    assert inv_csv_cleaner.clean_and_save_files([], str(tmp_path / "out"))
+
+
+def test_batch_rejects_colliding_output_names(tmp_path, caplog):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    files = [
+        write_input(tmp_path / "a", BASELINE_INPUT),
+        write_input(tmp_path / "b", BASELINE_INPUT),
+    ]
+
+    assert not inv_csv_cleaner.clean_and_save_files(files, str(tmp_path / "out"))
+    assert "would all be saved to" in caplog.text
+    assert not (tmp_path / "out").exists()
+
+
+@pytest.mark.parametrize("max_workers", [0, -1, "2"])
+def test_batch_rejects_invalid_max_workers(tmp_path, max_workers):
+    with pytest.raises(ValueError, match="max_workers"):
+        inv_csv_cleaner.clean_and_save_files([], str(tmp_path), max_workers)
+
+
+def test_main_glob_mode(tmp_path, monkeypatch):
+    write_input(tmp_path, BASELINE_INPUT, name="a.csv")
+    write_input(tmp_path, BASELINE_INPUT, name="b.csv")
+    argv = ["inv_csv_cleaner.py", "--glob", str(tmp_path / "*.csv")]
+    monkeypatch.setattr(sys, "argv", argv + [str(tmp_path / "out"), "2"])
+
+    with pytest.raises(SystemExit) as exc_info:
+        inv_csv_cleaner.main()
+
+    assert exc_info.value.code == 0
+    assert read_output(tmp_path, "a_cleaned.csv") == BASELINE_OUTPUT
+    assert read_output(tmp_path, "b_cleaned.csv") == BASELINE_OUTPUT
+
+
+@pytest.mark.parametrize("max_workers", ["x", "0", "-2"])
+def test_main_glob_mode_rejects_invalid_max_workers(
+    tmp_path, monkeypatch, caplog, max_workers
+):
+    write_input(tmp_path, BASELINE_INPUT, name="a.csv")
+    argv = ["inv_csv_cleaner.py", "--glob", str(tmp_path / "*.csv")]
+    monkeypatch.setattr(sys, "argv", argv + [str(tmp_path / "out"), max_workers])
+
+    with pytest.raises(SystemExit) as exc_info:
+        inv_csv_cleaner.main()
+
+    assert exc_info.value.code == 1
+    assert "max_workers must be a positive integer" in caplog.text
+    assert "Usage:" in caplog.text
+    assert not (tmp_path / "out").exists()